@@ -2,6 +2,10 @@
 import numpy as np
 
 
+_BOX_DTYPE = np.float64
+_FEATURE_DTYPE = np.float32
+
+
 class Detection(object):
     """
     This class represents a bounding box detection in a single image.
@@ -27,9 +31,9 @@ class Detection(object):
     """
 
     def __init__(self, tlwh, confidence, feature):
-        self.tlwh = np.asarray(tlwh, dtype=np.float)
+        self.tlwh = np.asarray(tlwh, dtype=_BOX_DTYPE)
         self.confidence = float(confidence)
-        self.feature = np.asarray(feature, dtype=np.float32)
+        self.feature = np.asarray(feature, dtype=_FEATURE_DTYPE)
 
     def to_tlbr(self):
         """Convert bounding box to format `(min x, min y, max x, max y)`, i.e.,
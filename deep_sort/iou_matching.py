@@ -10,7 +10,8 @@ def iou(bbox, candidates):
     Parameters
     ----------
     bbox : ndarray
-        A bounding box in format `(top left x, top left y, width, height)`.
+        A bounding box in format `(top left x, top left y, width, height)`, or
+        a matrix of N such bounding boxes (one per row).
     candidates : ndarray
         A matrix of candidate bounding boxes (one per row) in the same format
         as `bbox`.
@@ -20,21 +21,21 @@ def iou(bbox, candidates):
     ndarray
         The intersection over union in [0, 1] between the `bbox` and each
         candidate. A higher score means a larger fraction of the `bbox` is
-        occluded by the candidate.
+        occluded by the candidate. If `bbox` is a matrix of N bounding boxes,
+        returns an NxM matrix where M is the number of candidates.
 
     """
-    bbox_tl, bbox_br = bbox[:2], bbox[:2] + bbox[2:]
+    bbox_tl = bbox[..., np.newaxis, :2]
+    bbox_br = bbox_tl + bbox[..., np.newaxis, 2:]
     candidates_tl = candidates[:, :2]
     candidates_br = candidates[:, :2] + candidates[:, 2:]
 
-    tl = np.c_[np.maximum(bbox_tl[0], candidates_tl[:, 0])[:, np.newaxis],
-               np.maximum(bbox_tl[1], candidates_tl[:, 1])[:, np.newaxis]]
-    br = np.c_[np.minimum(bbox_br[0], candidates_br[:, 0])[:, np.newaxis],
-               np.minimum(bbox_br[1], candidates_br[:, 1])[:, np.newaxis]]
+    tl = np.maximum(bbox_tl, candidates_tl)
+    br = np.minimum(bbox_br, candidates_br)
     wh = np.maximum(0., br - tl)
 
-    area_intersection = wh.prod(axis=1)
-    area_bbox = bbox[2:].prod()
+    area_intersection = wh.prod(axis=-1)
+    area_bbox = bbox[..., np.newaxis, 2:].prod(axis=-1)
     area_candidates = candidates[:, 2:].prod(axis=1)
     return area_intersection / (area_bbox + area_candidates - area_intersection)
 
@@ -69,13 +70,21 @@ def iou_cost(tracks, detections, track_indices=None,
     if detection_indices is None:
         detection_indices = np.arange(len(detections))
 
-    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
-    for row, track_idx in enumerate(track_indices):
-        if tracks[track_idx].time_since_update > 1:
-            cost_matrix[row, :] = linear_assignment.INFTY_COST
-            continue
+    candidates = np.empty((len(detection_indices), 4))
+    for col, detection_idx in enumerate(detection_indices):
+        candidates[col] = detections[detection_idx].tlwh
 
-        bbox = tracks[track_idx].to_tlwh()
-        candidates = np.asarray([detections[i].tlwh for i in detection_indices])
-        cost_matrix[row, :] = 1. - iou(bbox, candidates)
+    # Tracks that have not been updated in the last frame are excluded from
+    # IOU matching; the remaining rows are computed in a single call.
+    rows = [row for row, track_idx in enumerate(track_indices)
+            if tracks[track_idx].time_since_update <= 1]
+    bboxes = np.empty((len(rows), 4))
+    for i, row in enumerate(rows):
+        bboxes[i] = tracks[track_indices[row]].to_tlwh()
+
+    cost_matrix = np.full(
+        (len(track_indices), len(detection_indices)),
+        linear_assignment.INFTY_COST)
+    if len(rows) > 0 and len(detection_indices) > 0:
+        cost_matrix[rows, :] = 1. - iou(bboxes, candidates)
     return cost_matrix
@@ -122,6 +122,46 @@ class KalmanFilter(object):
 
         return mean, covariance
 
+    def multi_predict(self, mean, covariance):
+        """Run Kalman filter prediction step on multiple state distributions.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional matrix of mean vectors of the object states at
+            the previous time step.
+        covariance : ndarray
+            The Nx8x8 dimensional array of covariance matrices of the object
+            states at the previous time step.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the mean vectors and covariance matrices of the predicted
+            states, stacked in the same layout as the inputs.
+
+        """
+        std_pos = [
+            self._std_weight_position * mean[:, 3],
+            self._std_weight_position * mean[:, 3],
+            1e-2 * np.ones_like(mean[:, 3]),
+            self._std_weight_position * mean[:, 3]]
+        std_vel = [
+            self._std_weight_velocity * mean[:, 3],
+            self._std_weight_velocity * mean[:, 3],
+            1e-5 * np.ones_like(mean[:, 3]),
+            self._std_weight_velocity * mean[:, 3]]
+        sqr = np.square(np.stack(std_pos + std_vel, axis=1))
+        diagonal = np.arange(sqr.shape[1])
+        motion_cov = np.zeros(covariance.shape)
+        motion_cov[:, diagonal, diagonal] = sqr
+
+        mean = np.dot(mean, self._motion_mat.T)
+        covariance = np.matmul(np.matmul(
+            self._motion_mat, covariance), self._motion_mat.T) + motion_cov
+
+        return mean, covariance
+
     def project(self, mean, covariance):
         """Project state distribution to measurement space.
 
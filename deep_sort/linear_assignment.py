@@ -1,7 +1,7 @@
 # vim: expandtab:ts=4:sw=4
 from __future__ import absolute_import
 import numpy as np
-from sklearn.utils.linear_assignment_ import linear_assignment
+from scipy.optimize import linear_sum_assignment
 from . import kalman_filter
 
 
@@ -55,16 +55,17 @@ def min_cost_matching(
     cost_matrix = distance_metric(
         tracks, detections, track_indices, detection_indices)
     cost_matrix[cost_matrix > max_distance] = max_distance + 1e-5
-    indices = linear_assignment(cost_matrix)
+    row_indices, col_indices = linear_sum_assignment(cost_matrix)
+    assigned_rows, assigned_cols = set(row_indices), set(col_indices)
 
     matches, unmatched_tracks, unmatched_detections = [], [], []
     for col, detection_idx in enumerate(detection_indices):
-        if col not in indices[:, 1]:
+        if col not in assigned_cols:
             unmatched_detections.append(detection_idx)
     for row, track_idx in enumerate(track_indices):
-        if row not in indices[:, 0]:
+        if row not in assigned_rows:
             unmatched_tracks.append(track_idx)
-    for row, col in indices:
+    for row, col in zip(row_indices, col_indices):
         track_idx = track_indices[row]
         detection_idx = detection_indices[col]
         if cost_matrix[row, col] > max_distance:
@@ -137,7 +138,8 @@ def matching_cascade(
                 distance_metric, max_distance, tracks, detections,
                 track_indices_l, unmatched_detections)
         matches += matches_l
-    unmatched_tracks = list(set(track_indices) - set(k for k, _ in matches))
+    matched_tracks = set(k for k, _ in matches)
+    unmatched_tracks = [k for k in track_indices if k not in matched_tracks]
     return matches, unmatched_tracks, unmatched_detections
 
 
@@ -177,14 +179,54 @@ def gate_cost_matrix(
     ndarray
         Returns the modified cost matrix.
 
+    """
+    cost_matrix[gating_mask(
+        kf, tracks, detections, track_indices, detection_indices,
+        only_position)] = gated_cost
+    return cost_matrix
+
+
+def gating_mask(
+        kf, tracks, detections, track_indices, detection_indices,
+        only_position=False):
+    """Determine infeasible associations based on the state distributions
+    obtained by Kalman filtering.
+
+    Parameters
+    ----------
+    kf : The Kalman filter.
+    tracks : List[track.Track]
+        A list of predicted tracks at the current time step.
+    detections : List[detection.Detection]
+        A list of detections at the current time step.
+    track_indices : List[int]
+        List of track indices that maps rows in the mask to tracks in
+        `tracks`.
+    detection_indices : List[int]
+        List of detection indices that maps columns in the mask to detections
+        in `detections`.
+    only_position : Optional[bool]
+        If True, only the x, y position of the state distribution is considered
+        during gating. Defaults to False.
+
+    Returns
+    -------
+    ndarray
+        Returns a boolean matrix of shape len(track_indices),
+        len(detection_indices) where entry (i, j) is True if the squared
+        Mahalanobis distance between `tracks[track_indices[i]]` and
+        `detections[detection_indices[j]]` exceeds the gating threshold.
+
     """
     gating_dim = 2 if only_position else 4
     gating_threshold = kalman_filter.chi2inv95[gating_dim]
-    measurements = np.asarray(
-        [detections[i].to_xyah() for i in detection_indices])
+    measurements = np.empty((len(detection_indices), 4))
+    for col, detection_idx in enumerate(detection_indices):
+        measurements[col] = detections[detection_idx].to_xyah()
+    mask = np.empty((len(track_indices), len(detection_indices)), dtype=bool)
     for row, track_idx in enumerate(track_indices):
         track = tracks[track_idx]
         gating_distance = kf.gating_distance(
             track.mean, track.covariance, measurements, only_position)
-        cost_matrix[row, gating_distance > gating_threshold] = gated_cost
-    return cost_matrix
+        mask[row] = gating_distance > gating_threshold
+    return mask
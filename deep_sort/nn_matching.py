@@ -1,4 +1,5 @@
 # vim: expandtab:ts=4:sw=4
+import functools
 import numpy as np
 
 
@@ -22,78 +23,58 @@ def _pdist(a, b):
     a, b = np.asarray(a), np.asarray(b)
     if len(a) == 0 or len(b) == 0:
         return np.zeros((len(a), len(b)))
-    a2, b2 = np.square(a).sum(axis=1), np.square(b).sum(axis=1)
-    r2 = -2. * np.dot(a, b.T) + a2[:, None] + b2[None, :]
-    r2 = np.clip(r2, 0., float(np.inf))
+    a2, b2 = np.einsum("ij,ij->i", a, a), np.einsum("ij,ij->i", b, b)
+    r2 = np.dot(a, b.T)
+    r2 *= -2.
+    r2 += a2[:, None]
+    r2 += b2[None, :]
+    np.maximum(r2, 0., out=r2)
     return r2
 
 
-def _cosine_distance(a, b, data_is_normalized=False):
-    """Compute pair-wise cosine distance between points in `a` and `b`.
+def _normalize(a):
+    """Scale rows of `a` to unit length.
 
     Parameters
     ----------
     a : array_like
         An NxM matrix of N samples of dimensionality M.
-    b : array_like
-        An LxM matrix of L samples of dimensionality M.
-    data_is_normalized : Optional[bool]
-        If True, assumes rows in a and b are unit length vectors.
-        Otherwise, a and b are explicitly normalized to lenght 1.
 
     Returns
     -------
     ndarray
-        Returns a matrix of size len(a), len(b) such that eleement (i, j)
-        contains the squared distance between `a[i]` and `b[j]`.
+        Returns a matrix of the same shape as `a` with rows of length 1.
 
     """
-    if not data_is_normalized:
-        a = np.asarray(a) / np.linalg.norm(a, axis=1, keepdims=True)
-        b = np.asarray(b) / np.linalg.norm(b, axis=1, keepdims=True)
-    return 1. - np.dot(a, b.T)
+    a = np.asarray(a)
+    return a / np.linalg.norm(a, axis=1, keepdims=True)
 
 
-def _nn_euclidean_distance(x, y):
-    """ Helper function for nearest neighbor distance metric (Euclidean).
-
-    Parameters
-    ----------
-    x : ndarray
-        A matrix of N row-vectors (sample points).
-    y : ndarray
-        A matrix of M row-vectors (query points).
-
-    Returns
-    -------
-    ndarray
-        A vector of length M that contains for each entry in `y` the
-        smallest Euclidean distance to a sample in `x`.
-
-    """
-    distances = _pdist(x, y)
-    return np.maximum(0.0, distances.min(axis=0))
-
-
-def _nn_cosine_distance(x, y):
-    """ Helper function for nearest neighbor distance metric (cosine).
+def _cosine_distance(a, b, data_is_normalized=False):
+    """Compute pair-wise cosine distance between points in `a` and `b`.
 
     Parameters
     ----------
-    x : ndarray
-        A matrix of N row-vectors (sample points).
-    y : ndarray
-        A matrix of M row-vectors (query points).
+    a : array_like
+        An NxM matrix of N samples of dimensionality M.
+    b : array_like
+        An LxM matrix of L samples of dimensionality M.
+    data_is_normalized : Optional[bool]
+        If True, assumes rows in a and b are unit length vectors.
+        Otherwise, a and b are explicitly normalized to lenght 1.
 
     Returns
     -------
     ndarray
-        A vector of length M that contains for each entry in `y` the
-        smallest cosine distance to a sample in `x`.
+        Returns a matrix of size len(a), len(b) such that eleement (i, j)
+        contains the squared distance between `a[i]` and `b[j]`.
 
     """
-    distances = _cosine_distance(x, y)
-    return distances.min(axis=0)
+    if not data_is_normalized:
+        a, b = _normalize(a), _normalize(b)
+    distances = np.dot(a, b.T)
+    np.subtract(1., distances, out=distances)
+    return distances
 
 
 class NearestNeighborDistanceMetric(object):
@@ -124,15 +105,21 @@ class NearestNeighborDistanceMetric(object):
 
 
         if metric == "euclidean":
-            self._metric = _nn_euclidean_distance
+            self._metric = _pdist
+            self._normalize_samples = False
         elif metric == "cosine":
-            self._metric = _nn_cosine_distance
+            # Samples and queries are normalized once up front, such that
+            # the distance reduces to a single matrix product.
+            self._metric = functools.partial(
+                _cosine_distance, data_is_normalized=True)
+            self._normalize_samples = True
         else:
             raise ValueError(
                 "Invalid metric; must be either 'euclidean' or 'cosine'")
         self.matching_threshold = matching_threshold
         self.budget = budget
         self.samples = {}
+        self._sample_matrices = {}
 
     def partial_fit(self, features, targets, active_targets):
         """Update the distance metric with new data.
@@ -147,11 +134,12 @@ class NearestNeighborDistanceMetric(object):
             A list of targets that are currently present in the scene.
 
         """
-        for feature, target in zip(features, targets):
-            self.samples.setdefault(target, []).append(feature)
-            if self.budget is not None:
-                self.samples[target] = self.samples[target][-self.budget:]
+        if len(features) > 0:
+            self._add_samples(features, targets)
         self.samples = {k: self.samples[k] for k in active_targets}
+        self._sample_matrices = {
+            k: v for k, v in self._sample_matrices.items()
+            if k in self.samples}
 
     def distance(self, features, targets):
         """Compute distance between features and targets.
@@ -171,7 +159,43 @@ class NearestNeighborDistanceMetric(object):
             `targets[i]` and `features[j]`.
 
         """
-        cost_matrix = np.zeros((len(targets), len(features)))
-        for i, target in enumerate(targets):
-            cost_matrix[i, :] = self._metric(self.samples[target], features)
-        return cost_matrix
+        if len(targets) == 0 or len(features) == 0:
+            return np.zeros((len(targets), len(features)))
+
+        # Compute distances to the samples of all targets in a single call,
+        # then reduce each target's block of rows to its nearest neighbor.
+        features = np.asarray(features, dtype=np.float32)
+        if self._normalize_samples:
+            features = _normalize(features)
+        samples = [self._sample_matrix(target) for target in targets]
+        offsets = np.cumsum([0] + [len(x) for x in samples[:-1]])
+        distances = self._metric(np.concatenate(samples), features)
+        cost_matrix = np.minimum.reduceat(distances, offsets, axis=0)
+        return cost_matrix.astype(np.float64)
+
+    def _sample_matrix(self, target):
+        """Get the samples of `target` stacked into a matrix (with unit length
+        rows for the cosine metric). The matrix is cached until new samples of
+        `target` arrive in `partial_fit`.
+        """
+        matrix = self._sample_matrices.get(target)
+        if matrix is None:
+            matrix = np.asarray(self.samples[target], dtype=np.float32)
+            if self._normalize_samples:
+                matrix = _normalize(matrix)
+            self._sample_matrices[target] = matrix
+        return matrix
+
+    def _add_samples(self, features, targets):
+        """Append features to the samples of their targets, dropping the
+        oldest samples that exceed the budget.
+        """
+        new_samples = {}
+        for feature, target in zip(features, targets):
+            new_samples.setdefault(target, []).append(feature)
+        for target, target_features in new_samples.items():
+            samples = self.samples.setdefault(target, [])
+            samples.extend(target_features)
+            if self.budget is not None:
+                del samples[:-self.budget]
+            self._sample_matrices.pop(target, None)
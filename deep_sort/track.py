@@ -1,4 +1,5 @@
 # vim: expandtab:ts=4:sw=4
+import collections
 
 
 class TrackState:
@@ -40,6 +41,9 @@ class Track:
     feature : Optional[ndarray]
         Feature vector of the detection this track originates from. If not None,
         this feature is added to the `features` cache.
+    feature_budget : Optional[int]
+        If not None, the `features` cache holds at most this number of the
+        most recent features.
 
     Attributes
     ----------
@@ -57,14 +61,14 @@ class Track:
         Total number of frames since last measurement update.
     state : TrackState
         The current track state.
-    features : List[ndarray]
+    features : Deque[ndarray]
         A cache of features. On each measurement update, the associated feature
-        vector is added to this list.
+        vector is added to this queue.
 
     """
 
     def __init__(self, mean, covariance, track_id, n_init, max_age,
-                 feature=None):
+                 feature=None, feature_budget=None):
         self.mean = mean
         self.covariance = covariance
         self.track_id = track_id
@@ -73,7 +77,7 @@ class Track:
         self.time_since_update = 0
 
         self.state = TrackState.Tentative
-        self.features = []
+        self.features = collections.deque(maxlen=feature_budget)
         if feature is not None:
             self.features.append(feature)
 
@@ -119,7 +123,15 @@ class Track:
             The Kalman filter.
 
         """
-        self.mean, self.covariance = kf.predict(self.mean, self.covariance)
+        self.mean[:], self.covariance[:] = kf.predict(
+            self.mean, self.covariance)
+        self.increment_age()
+
+    def increment_age(self):
+        """Advance the age of this track by one time step. Called by `predict`,
+        or directly when the state distribution has been propagated by the
+        caller.
+        """
         self.age += 1
         self.time_since_update += 1
 
@@ -135,7 +147,8 @@ class Track:
             The associated detection.
 
         """
-        self.mean, self.covariance = kf.update(
+        # Update in place, the state may be a view into the tracker's storage.
+        self.mean[:], self.covariance[:] = kf.update(
             self.mean, self.covariance, detection.to_xyah())
         self.features.append(detection.feature)
 
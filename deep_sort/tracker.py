@@ -1,5 +1,6 @@
 # vim: expandtab:ts=4:sw=4
 from __future__ import absolute_import
+import itertools
 import numpy as np
 from . import kalman_filter
 from . import linear_assignment
@@ -47,13 +48,20 @@ class Tracker:
         self.tracks = []
         self._next_id = 1
 
+        # State distributions of all tracks, stored row-wise in the order of
+        # `tracks`. Each track's `mean` and `covariance` is a view into a row.
+        self._means = np.empty((0, 8))
+        self._covariances = np.empty((0, 8, 8))
+
     def predict(self):
         """Propagate track state distributions one time step forward.
 
         This function should be called once every time step, before `update`.
         """
+        self._means[...], self._covariances[...] = self.kf.multi_predict(
+            self._means, self._covariances)
         for track in self.tracks:
-            track.predict(self.kf)
+            track.increment_age()
 
     def update(self, detections):
         """Perform measurement update and track management.
@@ -74,39 +82,68 @@ class Tracker:
                 self.kf, detections[detection_idx])
         for track_idx in unmatched_tracks:
             self.tracks[track_idx].mark_missed()
+        num_tracks = len(self.tracks)
         for detection_idx in unmatched_detections:
             self._initiate_track(detections[detection_idx])
         self.tracks = [t for t in self.tracks if not t.is_deleted()]
+        if len(self.tracks) != num_tracks or len(unmatched_detections) > 0:
+            self._pack_states()
 
         # Update distance metric.
-        active_targets = [t.track_id for t in self.tracks if t.is_confirmed()]
-        features, targets = [], []
-        for track in self.tracks:
-            if not track.is_confirmed():
-                continue
-            features += track.features
-            targets += [track.track_id for _ in track.features]
-            track.features = []
-        self.metric.partial_fit(
-            np.asarray(features), np.asarray(targets), active_targets)
+        confirmed_tracks = [t for t in self.tracks if t.is_confirmed()]
+        active_targets = [t.track_id for t in confirmed_tracks]
+        features = list(itertools.chain.from_iterable(
+            t.features for t in confirmed_tracks))
+        targets = np.repeat(
+            active_targets, [len(t.features) for t in confirmed_tracks])
+        for track in confirmed_tracks:
+            track.features.clear()
+        if len(features) > 0:
+            features = np.stack(features)
+        else:
+            features = np.empty((0, 0), dtype=np.float32)
+        self.metric.partial_fit(features, targets, active_targets)
 
     def _match(self, detections):
+        # The matching cascade evaluates the metric on subsets of the same
+        # detections at every level, so gather their features only once.
+        feature_dim = len(detections[0].feature) if detections else 0
+        detection_features = np.empty(
+            (len(detections), feature_dim), dtype=np.float32)
+        for i, detection in enumerate(detections):
+            detection_features[i] = detection.feature
 
         def gated_metric(tracks, dets, track_indices, detection_indices):
-            features = np.array([dets[i].feature for i in detection_indices])
-            targets = np.array([tracks[i].track_id for i in track_indices])
-            cost_matrix = self.metric.distance(features, targets)
-            cost_matrix = linear_assignment.gate_cost_matrix(
-                self.kf, cost_matrix, tracks, dets, track_indices,
-                detection_indices)
+            # Evaluate the Kalman gate first and compute the appearance
+            # distance only for tracks and detections that take part in at
+            # least one feasible association. Gated entries are filled in the
+            # same pass that writes the distances.
+            feasible = ~linear_assignment.gating_mask(
+                self.kf, tracks, dets, track_indices, detection_indices)
+            rows = np.flatnonzero(feasible.any(axis=1))
+            cols = np.flatnonzero(feasible.any(axis=0))
+
+            cost_matrix = np.full(
+                feasible.shape, linear_assignment.INFTY_COST)
+            if len(rows) > 0:
+                features = detection_features[np.take(detection_indices, cols)]
+                targets = np.fromiter(
+                    (tracks[track_indices[i]].track_id for i in rows),
+                    dtype=np.int64, count=len(rows))
+                block = np.ix_(rows, cols)
+                cost_matrix[block] = np.where(
+                    feasible[block], self.metric.distance(features, targets),
+                    linear_assignment.INFTY_COST)
 
             return cost_matrix
 
         # Split track set into confirmed and unconfirmed tracks.
-        confirmed_tracks = [
-            i for i, t in enumerate(self.tracks) if t.is_confirmed()]
-        unconfirmed_tracks = [
-            i for i, t in enumerate(self.tracks) if not t.is_confirmed()]
+        confirmed_tracks, unconfirmed_tracks = [], []
+        for i, t in enumerate(self.tracks):
+            if t.is_confirmed():
+                confirmed_tracks.append(i)
+            else:
+                unconfirmed_tracks.append(i)
 
         # Associate confirmed tracks using appearance features.
         matches_a, unmatched_tracks_a, unmatched_detections = \
@@ -115,24 +152,38 @@ class Tracker:
                 self.tracks, detections, confirmed_tracks)
 
         # Associate remaining tracks together with unconfirmed tracks using IOU.
-        iou_track_candidates = unconfirmed_tracks + [
-            k for k in unmatched_tracks_a if
-            self.tracks[k].time_since_update == 1]
-        unmatched_tracks_a = [
-            k for k in unmatched_tracks_a if
-            self.tracks[k].time_since_update != 1]
+        iou_track_candidates = unconfirmed_tracks
+        cascade_leftovers, unmatched_tracks_a = unmatched_tracks_a, []
+        for k in cascade_leftovers:
+            if self.tracks[k].time_since_update == 1:
+                iou_track_candidates.append(k)
+            else:
+                unmatched_tracks_a.append(k)
         matches_b, unmatched_tracks_b, unmatched_detections = \
             linear_assignment.min_cost_matching(
                 iou_matching.iou_cost, self.max_iou_distance, self.tracks,
                 detections, iou_track_candidates, unmatched_detections)
 
-        matches = matches_a + matches_b
-        unmatched_tracks = list(set(unmatched_tracks_a + unmatched_tracks_b))
-        return matches, unmatched_tracks, unmatched_detections
+        matches_a.extend(matches_b)
+        unmatched_tracks_a.extend(unmatched_tracks_b)
+        unmatched_tracks = list(dict.fromkeys(unmatched_tracks_a))
+        return matches_a, unmatched_tracks, unmatched_detections
 
     def _initiate_track(self, detection):
         mean, covariance = self.kf.initiate(detection.to_xyah())
         self.tracks.append(Track(
             mean, covariance, self._next_id, self.n_init, self.max_age,
-            detection.feature))
+            detection.feature, self.metric.budget or None))
         self._next_id += 1
+
+    def _pack_states(self):
+        """Copy the state distributions of all tracks into contiguous storage
+        and make each track's `mean` and `covariance` a view into it.
+        """
+        means = np.empty((len(self.tracks), ) + self._means.shape[1:])
+        covariances = np.empty(
+            (len(self.tracks), ) + self._covariances.shape[1:])
+        for row, track in enumerate(self.tracks):
+            means[row], covariances[row] = track.mean, track.covariance
+            track.mean, track.covariance = means[row], covariances[row]
+        self._means, self._covariances = means, covariances